@@ -1,8 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+from collections import OrderedDict
+from collections.abc import Sequence
 from dataclasses import dataclass
+from urllib.parse import urlencode
 
+import httpx
+import orjson
 from httpx import AsyncClient
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.logging import Ansi
+from app.logging import log
 
 
 @dataclass
@@ -15,52 +26,400 @@ class PerformanceResult:
     hypothetical_pp: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PerformanceRequest:
     beatmap_id: int
     mode: int
-    mods: int
-    max_combo: int
+    mods: int | None
+    max_combo: int | None
     accuracy: float
-    miss_count: int
-    legacy_score: int
+    miss_count: int | None
+    legacy_score: int | None
     passed_objects: int | None = None
 
 
+# (beatmap_id, mode, mods, max_combo,
+#  accuracy, miss_count, legacy_score, passed_objects)
+# NOTE: accuracy is rounded to `ACCURACY_PRECISION` decimals, so that values
+# differing only by float noise share the same cache entry.
+_RequestKey = tuple[
+    int,
+    int,
+    int | None,
+    int | None,
+    float,
+    int | None,
+    int | None,
+    int | None,
+]
+
+# (stars, pp, hypothetical_pp)
+_ResultData = tuple[float, float, float]
+
+_FAILED_RESULT: _ResultData = (0.0, 0.0, 0.0)
+
+# decimal places of accuracy which are significant to the calculator
+ACCURACY_PRECISION = 6
+
+# how long (in seconds) a failed request is remembered before retrying it
+FAILURE_COOLDOWN = 2.0
+
+# how long (in seconds) results are kept in redis
+PERSISTED_RESULT_TTL = 60 * 60 * 24 * 7
+
+# how many batch requests a single caller may have open at once
+MAX_CONCURRENT_BATCHES = 4
+
+# statuses meaning omajinai has no batch endpoint at all; not found,
+# method not allowed & not implemented, depending on how it's deployed.
+BATCH_UNSUPPORTED_STATUSES = frozenset({404, 405, 501})
+
+
+def _request_key(req: PerformanceRequest) -> _RequestKey:
+    return (
+        req.beatmap_id,
+        req.mode & 3,
+        req.mods,
+        req.max_combo,
+        round(req.accuracy, ACCURACY_PRECISION),
+        req.miss_count,
+        req.legacy_score,
+        req.passed_objects,
+    )
+
+
+_PARAM_NAMES = (
+    "beatmap_id",
+    "mode",
+    "mods",
+    "max_combo",
+    "accuracy",
+    "miss_count",
+    "legacy_score",
+    "passed_objects",
+)
+
+
+def _build_params(key: _RequestKey) -> dict[str, int | float]:
+    # unset fields are left out so omajinai can apply its own defaults
+    return {name: value for name, value in zip(_PARAM_NAMES, key) if value is not None}
+
+
+def _build_query(key: _RequestKey) -> bytes:
+    """Encode a request's query string directly, skipping httpx's generic
+    param encoder since the shape is always the same."""
+    return urlencode(
+        [(name, value) for name, value in zip(_PARAM_NAMES, key) if value is not None],
+    ).encode()
+
+
+class _RequestAbandoned(Exception):
+    """The caller sending a shared request was cancelled before it finished."""
+
+
+def _fail_shared(fut: asyncio.Future[_ResultData], exc: BaseException) -> None:
+    if fut.done():
+        return
+
+    fut.set_exception(exc)
+    # the owner raises it to its own caller regardless, so mark it as
+    # retrieved; otherwise it's logged when nobody else was waiting.
+    fut.exception()
+
+
+class _RateLimiter:
+    """A token bucket allowing roughly `rate` acquisitions per second."""
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            # tokens would never be refilled, and acquire() would spin forever
+            raise ValueError(f"Rate limit must be positive, got {rate!r}")
+
+        self._rate = rate
+        self._capacity = max(rate, 1.0)
+        self._tokens = self._capacity
+        self._last_refill: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+
+            while True:
+                now = loop.time()
+                if self._last_refill is not None:
+                    elapsed = now - self._last_refill
+                    self._tokens = min(
+                        self._capacity,
+                        self._tokens + elapsed * self._rate,
+                    )
+                self._last_refill = now
+
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+
+                await asyncio.sleep((1.0 - self._tokens) / self._rate)
+
+
 class Omajinai:
-    def __init__(self, base_url: str, http_client: AsyncClient) -> None:
-        self._base_url = base_url
+    def __init__(
+        self,
+        base_url: str,
+        http_client: AsyncClient,
+        cache_size: int = 4096,
+        max_concurrency: int = 64,
+        max_rps: float | None = None,
+        redis: aioredis.Redis | None = None,
+        cache_version: str | None = None,
+        max_batch_size: int = 256,
+    ) -> None:
         self._http_client = http_client
 
-    async def __make_performance_request(
+        # parsed once up front, rather than on every request
+        self._calculate_url = httpx.URL(f"{base_url}/calculate")
+        self._calculate_batch_url = httpx.URL(f"{base_url}/calculate/batch")
+
+        # bound the number of requests we have open against omajinai at
+        # once; `http_client` should allow at least this many connections
+        # (see `Omajinai.create`) so we never end up queueing inside
+        # httpx's connection pool instead.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # optionally also cap the request rate, to stay
+        # within what the calculator can actually sustain.
+        self._rate_limiter = _RateLimiter(max_rps) if max_rps is not None else None
+
+        # results are deterministic for a given request,
+        # so we can keep the most recently used ones around.
+        self._cache: OrderedDict[_RequestKey, _ResultData] = OrderedDict()
+        self._cache_size = cache_size
+
+        # results are also persisted to redis (when configured), so they
+        # survive restarts & are shared between workers. the calculator's
+        # version is part of the key, so bumping it invalidates everything.
+        self._redis = redis if cache_version is not None else None
+        self._persist_prefix = f"omajinai:performance:{cache_version}:"
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+        # flipped off the first time omajinai tells us it
+        # doesn't know about the batch endpoint.
+        self._batch_supported = True
+
+        # large calculations are sent in chunks of at most this many, which
+        # bounds both the payload size & the fan-out of the fallback path.
+        self._max_batch_size = max_batch_size
+
+        self._failures: dict[_RequestKey, float] = {}  # {key: retry_after}
+
+        self._inflight: dict[_RequestKey, asyncio.Future[_ResultData]] = {}
+
+    @classmethod
+    def create(
+        cls,
+        base_url: str,
+        *,
+        http2: bool = False,
+        limits: httpx.Limits | None = None,
+        cache_size: int = 4096,
+        max_concurrency: int = 64,
+        max_rps: float | None = None,
+        redis: aioredis.Redis | None = None,
+        cache_version: str | None = None,
+        max_batch_size: int = 256,
+    ) -> Omajinai:
+        """\
+        Create an adapter with its own http client, sized for omajinai.
+
+        The client keeps enough connections alive for `max_concurrency`
+        requests so that calculations reuse connections rather than
+        reconnecting. Note that httpx only negotiates HTTP/2 over TLS,
+        and requires the `h2` package to be installed for `http2=True`.
+        """
+        if limits is None:
+            limits = httpx.Limits(
+                max_connections=max_concurrency * 2,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=60,
+            )
+
+        http_client = AsyncClient(base_url=base_url, http2=http2, limits=limits)
+
+        return cls(
+            base_url=base_url,
+            http_client=http_client,
+            cache_size=cache_size,
+            max_concurrency=max_concurrency,
+            max_rps=max_rps,
+            redis=redis,
+            cache_version=cache_version,
+            max_batch_size=max_batch_size,
+        )
+
+    async def aclose(self) -> None:
+        # let pending writes finish while redis is still open
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+        await self._http_client.aclose()
+
+    async def __make_performance_request(self, key: _RequestKey) -> _ResultData:
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        # this exact request failed very recently; don't hammer
+        # a calculator that's likely already struggling with it.
+        loop = asyncio.get_running_loop()
+        failed_until = self._failures.get(key)
+        if failed_until is not None:
+            if failed_until > loop.time():
+                return _FAILED_RESULT
+
+            del self._failures[key]
+
+        # an identical request is already on its way to omajinai;
+        # share its result rather than sending another one.
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                # shielded, so that a cancelled waiter
+                # doesn't cancel the request for everyone
+                return await asyncio.shield(inflight)
+            except _RequestAbandoned:
+                # whoever sent it was cancelled; send it ourselves.
+                return await self.__make_performance_request(key)
+
+        fut: asyncio.Future[_ResultData] = loop.create_future()
+        self._inflight[key] = fut
+
+        try:
+            (result,) = await self.__fetch_persisted([key])
+            if result is None:
+                result = await self.__fetch_performance(key)
+                if result is not None:
+                    self.__persist_soon([(key, result)])
+        except asyncio.CancelledError:
+            # our cancellation isn't meant for anyone sharing the request
+            _fail_shared(fut, _RequestAbandoned())
+            raise
+        except BaseException as exc:
+            _fail_shared(fut, exc)
+            raise
+        finally:
+            del self._inflight[key]
+
+        if result is None:
+            # NOTE: failures are never cached, only
+            # remembered briefly so they'll be retried
+            self.__record_failure(key, loop.time())
+            result = _FAILED_RESULT
+        else:
+            self.__cache_result(key, result)
+
+        if not fut.done():
+            fut.set_result(result)
+
+        return result
+
+    def __cache_result(self, key: _RequestKey, result: _ResultData) -> None:
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def __record_failure(self, key: _RequestKey, now: float) -> None:
+        if len(self._failures) >= self._cache_size:
+            # drop anything which has already expired
+            self._failures = {
+                k: until for k, until in self._failures.items() if until > now
+            }
+
+        self._failures[key] = now + FAILURE_COOLDOWN
+
+    def __persist_key(self, key: _RequestKey) -> str:
+        return self._persist_prefix + ":".join(map(str, key))
+
+    async def __fetch_persisted(
         self,
-        req: PerformanceRequest,
-    ) -> dict[str, float]:
-        params = {k: v for k, v in vars(req).items() if v is not None}
-        params["mode"] %= 4
+        keys: list[_RequestKey],
+    ) -> list[_ResultData | None]:
+        if self._redis is None:
+            return [None] * len(keys)
+
+        try:
+            values = await self._redis.mget([self.__persist_key(key) for key in keys])
+        except RedisError as exc:
+            log(f"Failed to read persisted performance results: {exc!r}", Ansi.LYELLOW)
+            return [None] * len(keys)
+
+        results: list[_ResultData | None] = []
+        for key, value in zip(keys, values):
+            if value is None:
+                results.append(None)
+                continue
+
+            try:
+                stars, pp, hypothetical_pp = orjson.loads(value)
+            except (ValueError, TypeError):
+                # corrupt or from an incompatible version; recalculate it
+                results.append(None)
+                continue
+
+            result = (stars, pp, hypothetical_pp)
+            self.__cache_result(key, result)
+            results.append(result)
+
+        return results
+
+    def __persist_soon(self, results: list[tuple[_RequestKey, _ResultData]]) -> None:
+        """Persist results to redis in the background, off the hot path."""
+        if self._redis is None:
+            return
+
+        task = asyncio.create_task(self.__persist(results))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def __persist(self, results: list[tuple[_RequestKey, _ResultData]]) -> None:
+        assert self._redis is not None
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, result in results:
+                    pipe.set(  # type: ignore[unused-awaitable]
+                        self.__persist_key(key),
+                        orjson.dumps(result),
+                        ex=PERSISTED_RESULT_TTL,
+                    )
+
+                await pipe.execute()
+        except RedisError as exc:
+            log(f"Failed to persist performance results: {exc!r}", Ansi.LYELLOW)
+
+    async def __fetch_performance(self, key: _RequestKey) -> _ResultData | None:
+        url = self._calculate_url.copy_with(query=_build_query(key))
 
         # XXX: wrapped in try except since sometime my pc
         #      is too slow to waking omajinai
         #      aand safety first!
         try:
-            resp = await self._http_client.get(
-                f"{self._base_url}/calculate",
-                params=params,
-            )
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+
+            async with self._semaphore:
+                resp = await self._http_client.get(url)
 
             # i dont like how there has 2 fallbacks here but whatever
             if resp.status_code != 200:
-                return {"stars": 0.0, "pp": 0.0}
-        except:
-            return {"stars": 0.0, "pp": 0.0}
+                return None
 
-        data = resp.json()
+            data = orjson.loads(resp.content)["data"]
+        except (httpx.HTTPError, ValueError) as exc:
+            log(f"Omajinai request for beatmap {key[0]} failed: {exc!r}", Ansi.LYELLOW)
+            return None
 
-        return {
-            "stars": data["data"]["stars"],
-            "pp": data["data"]["pp"],
-            "hypothetical_pp": data["data"]["hypothetical_pp"],
-        }
+        return (data["stars"], data["pp"], data["hypothetical_pp"])
 
     async def calculate_performance_single(
         self,
@@ -73,20 +432,170 @@ class Omajinai:
         legacy_score: int,
         passed_objects: int | None = None,
     ) -> PerformanceResult:
-        request = PerformanceRequest(
-            beatmap_id=beatmap_id,
-            mode=mode,
-            mods=mods,
-            max_combo=max_combo,
-            accuracy=accuracy,
-            miss_count=miss_count,
-            legacy_score=legacy_score,
-            passed_objects=passed_objects,
+        key = (
+            beatmap_id,
+            mode & 3,
+            mods,
+            max_combo,
+            round(accuracy, ACCURACY_PRECISION),
+            miss_count,
+            legacy_score,
+            passed_objects,
         )
-        data = await self.__make_performance_request(request)
 
-        return PerformanceResult(
-            stars=data["stars"],
-            pp=data["pp"],
-            hypothetical_pp=data["hypothetical_pp"],
+        # fast path; most calculations are repeats we already know
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        else:
+            result = await self.__make_performance_request(key)
+
+        return PerformanceResult(*result)
+
+    async def calculate_performance_batch(
+        self,
+        requests: Sequence[PerformanceRequest],
+    ) -> list[PerformanceResult]:
+        """\
+        Calculate performance for many requests in a single round-trip.
+
+        Results are returned in the same order as `requests`; anything
+        already in the cache is served locally and not sent to omajinai.
+        """
+        if len(requests) == 1:
+            # nothing to batch; the single path also shares
+            # identical calculations which are already in flight.
+            single = await self.__make_performance_request(_request_key(requests[0]))
+            return [PerformanceResult(*single)]
+
+        results: list[_ResultData | None] = [None] * len(requests)
+        misses: dict[_RequestKey, list[int]] = {}
+
+        loop = asyncio.get_running_loop()
+
+        for idx, req in enumerate(requests):
+            key = _request_key(req)
+
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                results[idx] = cached
+            elif self._failures.get(key, 0.0) > loop.time():
+                results[idx] = _FAILED_RESULT
+            else:
+                misses.setdefault(key, []).append(idx)
+
+        if misses:
+            persisted = await self.__fetch_persisted(list(misses))
+            for key, result in zip(list(misses), persisted):
+                if result is not None:
+                    for idx in misses.pop(key):
+                        results[idx] = result
+
+        if misses:
+            pending = list(misses)
+            limit = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+            async def calculate_chunk(keys: list[_RequestKey]) -> list[_ResultData]:
+                async with limit:
+                    return await self.__calculate_uncached(keys)
+
+            chunks = await asyncio.gather(
+                *[
+                    calculate_chunk(pending[start : start + self._max_batch_size])
+                    for start in range(0, len(pending), self._max_batch_size)
+                ],
+            )
+
+            fetched = [result for chunk in chunks for result in chunk]
+            for indices, result in zip(misses.values(), fetched):
+                for idx in indices:
+                    results[idx] = result
+
+        performances = []
+        for data in results:
+            assert data is not None
+            performances.append(PerformanceResult(*data))
+
+        return performances
+
+    async def __calculate_uncached(
+        self,
+        keys: list[_RequestKey],
+    ) -> list[_ResultData]:
+        if self._batch_supported:
+            fetched = await self.__fetch_performance_batch(keys)
+        else:
+            fetched = None
+
+        if fetched is not None:
+            for key, result in zip(keys, fetched):
+                self.__cache_result(key, result)
+            self.__persist_soon(list(zip(keys, fetched)))
+            return fetched
+
+        if self._batch_supported:
+            # the batch request failed; don't retry each of
+            # them individually against a struggling calculator.
+            now = asyncio.get_running_loop().time()
+            for key in keys:
+                self.__record_failure(key, now)
+            return [_FAILED_RESULT] * len(keys)
+
+        # omajinai doesn't support batching;
+        # fall back to one request per calculation.
+        return await asyncio.gather(
+            *[self.__make_performance_request(key) for key in keys],
         )
+
+    async def __fetch_performance_batch(
+        self,
+        keys: list[_RequestKey],
+    ) -> list[_ResultData] | None:
+        payload = [_build_params(key) for key in keys]
+
+        try:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+
+            async with self._semaphore:
+                resp = await self._http_client.post(
+                    self._calculate_batch_url,
+                    json=payload,
+                )
+
+            if resp.status_code in BATCH_UNSUPPORTED_STATUSES:
+                # other chunks may have already found out
+                if not self._batch_supported:
+                    return None
+
+                log(
+                    "Omajinai does not support batch calculations; "
+                    "falling back to single requests.",
+                    Ansi.LYELLOW,
+                )
+                self._batch_supported = False
+                return None
+
+            if resp.status_code != 200:
+                return None
+
+            data = orjson.loads(resp.content)["data"]
+        except (httpx.HTTPError, ValueError) as exc:
+            log(f"Omajinai batch request failed: {exc!r}", Ansi.LYELLOW)
+            return None
+
+        if len(data) != len(keys):
+            # results are matched to requests by position,
+            # so a partial response can't be trusted at all.
+            log(
+                f"Omajinai batch returned {len(data)} results "
+                f"for {len(keys)} requests.",
+                Ansi.LYELLOW,
+            )
+            return None
+
+        return [
+            (result["stars"], result["pp"], result["hypothetical_pp"])
+            for result in data
+        ]
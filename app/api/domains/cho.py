@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import hashlib
 import re
 import struct
@@ -16,6 +15,7 @@ from typing import Literal
 from typing import TypedDict
 from zoneinfo import ZoneInfo
 
+import anyio
 import bcrypt
 from fastapi import APIRouter
 from fastapi import Response
@@ -153,15 +153,23 @@ web: <a href="https://{domain}">https://{domain}</a><br>
 </body>
 </html>"""
 
+# these replies never change, so build them once rather than per request
+CHO_GET_RESP_CONTENT = CHO_GET_RESP.format(domain=BASE_DOMAIN)
+
+NOT_LOGGED_IN_RESP_CONTENT = (
+    app.packets.notification(
+        "You don't seem to be logged into refx anymore... "
+        "This is common during server restarts, trying to log you back in.",
+    )
+    # 0ms until reconnection
+    + app.packets.restart_server(0)
+)
+
 
 @router.get("/")
 async def bancho_http_handler() -> Response:
     """Handle a request from a web browser."""
-    return HTMLResponse(
-        CHO_GET_RESP.format(
-            domain=BASE_DOMAIN,
-        ),
-    )
+    return HTMLResponse(CHO_GET_RESP_CONTENT)
 
 
 @router.get("/online")
@@ -278,15 +286,7 @@ async def bancho_handler(
     if not player:
         # chances are, we just restarted the server
         # tell their client to reconnect immediately.
-        return Response(
-            content=(
-                app.packets.notification(
-                    "You don't seem to be logged into refx anymore... "
-                    "This is common during server restarts, trying to log you back in.",
-                )
-                + app.packets.restart_server(0)  # ms until reconnection
-            ),
-        )
+        return Response(content=NOT_LOGGED_IN_RESP_CONTENT)
 
     if player.restricted:
         # restricted users may only use certain packet handlers.
@@ -799,6 +799,11 @@ def parse_adapters_string(adapters_string: str) -> tuple[list[str], bool]:
     return adapters, running_under_wine
 
 
+# bcrypt is ~200ms of cpu per check; run it on worker threads, but only a
+# few at a time so a flood of logins can't starve the shared thread pool.
+BCRYPT_LIMITER = anyio.CapacityLimiter(4)
+
+
 async def authenticate(
     username: str,
     untrusted_password: bytes,
@@ -817,7 +822,12 @@ async def authenticate(
         if untrusted_password != app.state.cache.bcrypt[trusted_hashword]:
             return None
     else:  # ~200ms
-        if not bcrypt.checkpw(untrusted_password, trusted_hashword):
+        if not await anyio.to_thread.run_sync(
+            bcrypt.checkpw,
+            untrusted_password,
+            trusted_hashword,
+            limiter=BCRYPT_LIMITER,
+        ):
             return None
 
         app.state.cache.bcrypt[trusted_hashword] = untrusted_password
@@ -1488,7 +1498,7 @@ class SendPrivateMessage(BasePacket):
                             )
 
                             resp_msg = " | ".join(
-                                f"{acc}%: {result['performance']['pp']:,.2f}pp"
+                                f"{acc}%: {result.pp:,.2f}pp"
                                 for acc, result in zip(
                                     app.settings.PP_CACHED_ACCURACIES,
                                     results,
@@ -1954,7 +1964,7 @@ class MatchComplete(BasePacket):
 
         if player.match.is_scrimming:
             # determine winner, update match points & inform players.
-            asyncio.create_task(  # type: ignore[unused-awaitable]
+            app.state.sessions.create_background_task(
                 player.match.update_matchpoints(was_playing),
             )
 
@@ -118,8 +118,10 @@ async def lifespan(asgi_app: BanchoAPI) -> AsyncIterator[None]:
     # shutdown services
 
     await app.state.services.http_client.aclose()
+    await app.state.services.omajinai.aclose()
     await app.state.services.database.disconnect()
     await app.state.services.redis.aclose()
+    await app.state.services.pubsub_redis.aclose()
 
     if app.state.services.datadog is not None:
         app.state.services.datadog.stop()  # type: ignore[no-untyped-call]
@@ -7,9 +7,11 @@ import struct
 from pathlib import Path as SystemPath
 from typing import Literal
 
+import anyio
 from fastapi import APIRouter
 from fastapi import status
 from fastapi.param_functions import Query
+from fastapi.responses import FileResponse
 from fastapi.responses import ORJSONResponse
 from fastapi.responses import Response
 from fastapi.security import HTTPBearer
@@ -618,22 +620,21 @@ async def api_get_replay(
     """
     # fetch replay file & make sure it exists
     replay_file = REPLAYS_PATH / f"{score_id}.osr"
-    if not replay_file.exists():
+    if not await anyio.to_thread.run_sync(replay_file.is_file):
         return ORJSONResponse(
             {"status": "Replay not found."},
             status_code=status.HTTP_404_NOT_FOUND,
         )
-    # read replay frames from file
-    raw_replay_data = replay_file.read_bytes()
     if not include_headers:
-        return Response(
-            bytes(raw_replay_data),
+        # raw frames only; let starlette stream the file from disk
+        return FileResponse(
+            replay_file,
             media_type="application/octet-stream",
-            headers={
-                "Content-Description": "File Transfer",
-                # TODO: should we include a Content-Disposition?
-            },
+            filename=f"{score_id}.osr",
+            headers={"Content-Description": "File Transfer"},
         )
+    # read replay frames from file
+    raw_replay_data = await anyio.to_thread.run_sync(replay_file.read_bytes)
     # add replay headers from sql
     # TODO: osu_version & life graph in scores tables?
     row = await app.state.services.database.fetch_one(
@@ -9,8 +9,17 @@ from typing import TypedDict
 class Message(TypedDict):
     type: str
     pattern: str | None
-    channel: bytes
-    data: bytes | Any
+    channel: str
+    data: str | Any
+
+
+class AnnouncePayload(TypedDict):
+    user_id: int
+    map_id: int
+    map_name: str
+    acc: float
+    pp: float
+    mods: int
 
 
 PUBSUB_HANDLER = Callable[[str], Awaitable[None]]
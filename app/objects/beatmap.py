@@ -12,7 +12,9 @@ from pathlib import Path
 from typing import Any
 from typing import TypedDict
 
+import anyio
 import httpx
+import orjson
 from tenacity import retry
 from tenacity.stop import stop_after_attempt
 
@@ -59,7 +61,7 @@ async def api_get_beatmaps(**params: Any) -> BeatmapApiResponse:
         url = "https://osu.direct/api/get_beatmaps"
 
     response = await app.state.services.http_client.get(url, params=params)
-    response_data = response.json()
+    response_data = orjson.loads(response.content)
     if response.status_code == 200 and response_data:  # (data may be [])
         return {"data": response_data, "status_code": response.status_code}
 
@@ -91,6 +93,16 @@ def write_osu_file_to_disk(beatmap_id: int, data: bytes) -> None:
     osu_file_path.write_bytes(data)
 
 
+def beatmap_url(beatmap_id: int) -> str:
+    """The osu! beatmap url for a given beatmap id."""
+    return f"https://osu.{app.settings.DOMAIN}/b/{beatmap_id}"
+
+
+def beatmap_embed(beatmap_id: int, full_name: str) -> str:
+    """An osu! chat embed to a given beatmap's osu! beatmap page."""
+    return f"[{beatmap_url(beatmap_id)} {full_name}]"
+
+
 async def ensure_osu_file_is_available(
     beatmap_id: int,
     expected_md5: str | None = None,
@@ -104,7 +116,13 @@ async def ensure_osu_file_is_available(
 
     Returns whether the file is available for use.
     """
-    if disk_has_expected_osu_file(beatmap_id, expected_md5):
+    # NOTE: the disk i/o (and md5 of the whole file) is done in a worker
+    # thread so we don't block the event loop for other requests meanwhile.
+    if await anyio.to_thread.run_sync(
+        disk_has_expected_osu_file,
+        beatmap_id,
+        expected_md5,
+    ):
         return True
 
     try:
@@ -115,7 +133,7 @@ async def ensure_osu_file_is_available(
         log(f"Failed to fetch osu file for {beatmap_id}", Ansi.LRED)
         return False
 
-    write_osu_file_to_disk(beatmap_id, latest_osu_file)
+    await anyio.to_thread.run_sync(write_osu_file_to_disk, beatmap_id, latest_osu_file)
     return True
 
 
@@ -339,12 +357,12 @@ class Beatmap:
     @property
     def url(self) -> str:
         """The osu! beatmap url for `self`."""
-        return f"https://osu.{app.settings.DOMAIN}/b/{self.id}"
+        return beatmap_url(self.id)
 
     @property
     def embed(self) -> str:
         """An osu! chat embed to `self`'s osu! beatmap page."""
-        return f"[{self.url} {self.full_name}]"
+        return beatmap_embed(self.id, self.full_name)
 
     @property
     def has_leaderboard(self) -> bool:
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import time
 import uuid
 from dataclasses import dataclass
@@ -488,7 +487,7 @@ class Player:
         webhook_url = app.settings.DISCORD_AUDIT_LOG_WEBHOOK
         if webhook_url:
             webhook = Webhook(webhook_url, content=log_msg)
-            asyncio.create_task(webhook.post())  # type: ignore[unused-awaitable]
+            app.state.sessions.create_background_task(webhook.post())
 
         # refresh their client state
         if self.is_online:
@@ -525,7 +524,7 @@ class Player:
         webhook_url = app.settings.DISCORD_AUDIT_LOG_WEBHOOK
         if webhook_url:
             webhook = Webhook(webhook_url, content=log_msg)
-            asyncio.create_task(webhook.post())  # type: ignore[unused-awaitable]
+            app.state.sessions.create_background_task(webhook.post())
 
         if self.is_online:
             # log the user out if they're offline, this
@@ -986,7 +985,7 @@ class Player:
             id=self.id,
             latest_activity=int(time.time()),
         )
-        app.state.loop.create_task(task)  # type: ignore[unused-awaitable]
+        app.state.sessions.create_background_task(task)
 
     def enqueue(self, data: bytes) -> None:
         """Add data to be sent to the client."""
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import functools
 from datetime import datetime
 from enum import IntEnum
@@ -37,21 +38,9 @@ class Grade(IntEnum):
     X = 8  # SS
     XH = 9  # HD SS
 
-    @classmethod
-    @functools.cache
-    def from_str(cls, s: str) -> Grade:
-        return {
-            "xh": Grade.XH,
-            "x": Grade.X,
-            "sh": Grade.SH,
-            "s": Grade.S,
-            "a": Grade.A,
-            "b": Grade.B,
-            "c": Grade.C,
-            "d": Grade.D,
-            "f": Grade.F,
-            "n": Grade.N,
-        }[s.lower()]
+    @staticmethod
+    def from_str(s: str) -> Grade:
+        return GRADE_BY_STR[s.lower()]
 
     def __format__(self, format_spec: str) -> str:
         if format_spec == "stats_column":
@@ -60,6 +49,16 @@ class Grade(IntEnum):
             raise ValueError(f"Invalid format specifier {format_spec}")
 
 
+GRADE_BY_STR: dict[str, Grade] = {
+    name: grade
+    for grade in Grade
+    for name in (grade.name, grade.name.lower())  # sql stores grades upper case
+}
+
+# a bare lookup for hot paths which already have an exact-case grade string
+grade_from_str = GRADE_BY_STR.__getitem__
+
+
 @unique
 @pymysql_encode(escape_enum)
 class SubmissionStatus(IntEnum):
@@ -69,11 +68,27 @@ class SubmissionStatus(IntEnum):
     BEST = 2
 
     def __repr__(self) -> str:
-        return {
-            self.FAILED: "Failed",
-            self.SUBMITTED: "Submitted",
-            self.BEST: "Best",
-        }[self]
+        return SUBMISSION_STATUS_REPRS[self.value]
+
+
+# indexed by SubmissionStatus value
+SUBMISSION_STATUS_REPRS = ("Failed", "Submitted", "Best")
+
+# enum lookups for values read from sql; indexing a dict is much cheaper
+# than calling the enum constructors for every score we load.
+GAME_MODE_BY_VALUE = {mode.value: mode for mode in GameMode}
+SUBMISSION_STATUS_BY_VALUE = {status.value: status for status in SubmissionStatus}
+
+
+# flag values are sparse combinations, so memoize these instead
+@functools.lru_cache(maxsize=1024)
+def mods_from_int(value: int) -> Mods:
+    return Mods(value)
+
+
+@functools.lru_cache(maxsize=1024)
+def client_flags_from_int(value: int) -> ClientFlags:
+    return ClientFlags(value)
 
 
 class Score:
@@ -110,6 +125,36 @@ class Score:
         value will always be accurate for any score.
     """
 
+    __slots__ = (
+        "id",
+        "bmap",
+        "player",
+        "mode",
+        "mods",
+        "pp",
+        "sr",
+        "score",
+        "max_combo",
+        "acc",
+        "n300",
+        "n100",
+        "n50",
+        "nmiss",
+        "ngeki",
+        "nkatu",
+        "grade",
+        "passed",
+        "perfect",
+        "status",
+        "client_time",
+        "server_time",
+        "time_elapsed",
+        "client_flags",
+        "client_checksum",
+        "rank",
+        "prev_best",
+    )
+
     def __init__(self) -> None:
         # TODO: check whether the reamining Optional's should be
         self.id: int | None = None
@@ -174,15 +219,17 @@ class Score:
         s = cls()
 
         s.id = rec["id"]
-        s.bmap = await Beatmap.from_md5(rec["map_md5"])
-        s.player = await app.state.sessions.players.from_cache_or_sql(id=rec["userid"])
+        s.bmap, s.player = await asyncio.gather(
+            Beatmap.from_md5(rec["map_md5"]),
+            app.state.sessions.players.from_cache_or_sql(id=rec["userid"]),
+        )
 
         s.sr = 0.0  # TODO
 
         s.pp = rec["pp"]
         s.score = rec["score"]
         s.max_combo = rec["max_combo"]
-        s.mods = Mods(rec["mods"])
+        s.mods = mods_from_int(rec["mods"])
         s.acc = rec["acc"]
         s.n300 = rec["n300"]
         s.n100 = rec["n100"]
@@ -190,14 +237,14 @@ class Score:
         s.nmiss = rec["nmiss"]
         s.ngeki = rec["ngeki"]
         s.nkatu = rec["nkatu"]
-        s.grade = Grade.from_str(rec["grade"])
+        s.grade = grade_from_str(rec["grade"])
         s.perfect = rec["perfect"] == 1
-        s.status = SubmissionStatus(rec["status"])
+        s.status = SUBMISSION_STATUS_BY_VALUE[rec["status"]]
         s.passed = s.status != SubmissionStatus.FAILED
-        s.mode = GameMode(rec["mode"])
+        s.mode = GAME_MODE_BY_VALUE[rec["mode"]]
         s.server_time = rec["play_time"]
         s.time_elapsed = rec["time_elapsed"]
-        s.client_flags = ClientFlags(rec["client_flags"])
+        s.client_flags = client_flags_from_int(rec["client_flags"])
         s.client_checksum = rec["online_checksum"]
 
         if s.bmap:
@@ -210,28 +257,12 @@ class Score:
     async def calculate_placement(self) -> int:
         assert self.bmap is not None
 
-        if self.mode >= GameMode.RELAX_OSU:
-            scoring_metric = "pp"
-            score = self.pp
-        else:
-            scoring_metric = "score"
-            score = self.score
-
-        num_better_scores: int | None = await app.state.services.database.fetch_val(
-            "SELECT COUNT(*) AS c FROM scores s "
-            "INNER JOIN users u ON u.id = s.userid "
-            "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
-            "AND s.status = 2 AND u.priv & 1 "
-            f"AND s.{scoring_metric} > :score",
-            {
-                "map_md5": self.bmap.md5,
-                "mode": self.mode,
-                "score": score,
-            },
-            column=0,  # COUNT(*)
+        return await scores_repo.fetch_placement(
+            map_md5=self.bmap.md5,
+            mode=self.mode,
+            pp=self.pp,
+            score=self.score,
         )
-        assert num_better_scores is not None
-        return num_better_scores + 1
 
     """ Methods for updating a score. """
 
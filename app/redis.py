@@ -2,16 +2,26 @@ from __future__ import annotations
 
 import asyncio
 from collections.abc import Callable
+from typing import cast
 
+import orjson
 from redis.asyncio.client import PubSub
 
 import app
+from app.constants.mods import Mods
 from app.constants.redis import PUBSUB_HANDLER
+from app.constants.redis import AnnouncePayload
 from app.constants.redis import Message
 from app.logging import Ansi
 from app.logging import log
+from app.objects.beatmap import beatmap_embed
+from app.objects.channel import Channel
 from app.objects.player import Player
-from app.objects.score import Score
+from app.repositories import scores as scores_repo
+
+# the #announce channel is created at startup and lives for the server's
+# lifetime, so we resolve it once rather than scanning channels per message.
+announce_channel: Channel | None = None
 
 
 def register_pubsub(channel: str) -> Callable[[PUBSUB_HANDLER], PUBSUB_HANDLER]:
@@ -37,43 +47,89 @@ async def refresh_stats(payload: str) -> None:
 
 @register_pubsub("refx:announce")
 async def announce(payload: str) -> None:
-    score_id = int(payload)
-    score = await Score.from_sql(score_id)
-    announce_chan = app.state.sessions.channels.get_by_name("#announce")
+    """\
+    Announce a new #1 score in #announce.
+
+    The payload is either a json object carrying everything needed for
+    the message (see `AnnouncePayload`), or, from older publishers, a
+    bare score id to look those up by.
+    """
+    if payload.isdigit():
+        view = await scores_repo.fetch_announce_view(int(payload))
+        if view is None:
+            return
+
+        data: AnnouncePayload = {
+            "user_id": view["user_id"],
+            "map_id": view["map_id"],
+            "map_name": f"{view['artist']} - {view['title']} [{view['version']}]",
+            "acc": view["acc"],
+            "pp": view["pp"],
+            "mods": view["mods"],
+        }
+    else:
+        data = cast(AnnouncePayload, orjson.loads(payload))
+
+    player = await app.state.sessions.players.from_cache_or_sql(id=data["user_id"])
+    map_embed = beatmap_embed(data["map_id"], data["map_name"])
+    mods = Mods(data["mods"])
+
+    global announce_channel
+    if announce_channel is None:
+        announce_channel = app.state.sessions.channels.get_by_name("#announce")
 
     ann = [
-        f"\x01ACTION achieved #1 on {score.bmap.embed}",
-        f"with {score.acc:.2f}% for {score.pp}pp.",
+        f"\x01ACTION achieved #1 on {map_embed}",
+        f"with {data['acc']:.2f}% for {data['pp']}pp.",
     ]
 
-    if score.mods:
-        ann.insert(1, f"+{score.mods!r}")
+    if mods:
+        ann.insert(1, f"+{mods!r}")
 
-    if announce_chan:
-        announce_chan.send(" ".join(ann), sender=score.player, to_self=True)
+    if announce_channel:
+        announce_channel.send(" ".join(ann), sender=player, to_self=True)
 
     log("served announce!", Ansi.GREEN)
 
 
 @register_pubsub("refx:restrict")
 async def restrict(payload: str) -> None:
-    user_id, reason = payload.split("|")
+    user_id, reason = payload.split("|", 1)
     player = await app.state.sessions.players.from_cache_or_sql(int(user_id))
 
-    player.restrict(app.state.sessions.bot, str(reason))
+    await player.restrict(app.state.sessions.bot, reason)
 
     log("served restrict!", Ansi.GREEN)
 
 
 @register_pubsub("refx:notify")
 async def notify(payload: str) -> None:
-    user_id, message = payload.split("|")
+    user_id, message = payload.split("|", 1)
     player: Player = app.state.sessions.players.get(id=int(user_id))
 
-    player.enqueue(app.packets.notification(str(message)))
+    player.enqueue(app.packets.notification(message))
+
+
+# upper bound on how many pubsub handlers may run at once
+MAX_CONCURRENT_PUBSUB_HANDLERS = 32
+
+
+async def _run_pubsub_handler(
+    handler: PUBSUB_HANDLER,
+    payload: str,
+    semaphore: asyncio.Semaphore,
+) -> None:
+    try:
+        await handler(payload)
+    except:
+        ...
+    finally:
+        semaphore.release()
 
 
 async def loop_pubsubs(pubsub: PubSub) -> None:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PUBSUB_HANDLERS)
+
     while True:
         try:
             message: Message | None = await pubsub.get_message(
@@ -81,23 +137,27 @@ async def loop_pubsubs(pubsub: PubSub) -> None:
                 timeout=1.0,
             )
             if message is not None:
-                channel = message["channel"].decode()
-                payload = message["data"].decode()
+                channel = message["channel"]
+                payload = message["data"]
 
                 handler = app.state.pubsubs.get(channel)
                 if handler is not None:
-                    try:
-                        await handler(payload)
-                    except:
-                        ...
-
-            await asyncio.sleep(0.01)
+                    # run handlers concurrently so a slow one doesn't hold
+                    # up the messages behind it; acquiring here applies
+                    # backpressure to the reader once we're at the limit.
+                    await semaphore.acquire()
+                    app.state.sessions.create_background_task(
+                        _run_pubsub_handler(handler, payload, semaphore),
+                    )
         except TimeoutError:
             continue
 
 
 async def initialize_pubsubs() -> None:
-    pubsub: PubSub = app.state.services.redis.pubsub()
+    global announce_channel
+    announce_channel = app.state.sessions.channels.get_by_name("#announce")
+
+    pubsub: PubSub = app.state.services.pubsub_redis.pubsub()
     await pubsub.subscribe(*app.state.pubsubs.keys())
 
     pubsub_loop = asyncio.create_task(loop_pubsubs(pubsub))
@@ -19,7 +19,10 @@ from sqlalchemy.dialects.mysql import TINYINT
 import app.state.services
 from app._typing import UNSET
 from app._typing import _UnsetSentinel
+from app.constants.gamemodes import GameMode
 from app.repositories import Base
+from app.repositories.maps import MapsTable
+from app.repositories.users import UsersTable
 
 
 class ScoresTable(Base):
@@ -112,6 +115,17 @@ class Score(TypedDict):
     online_checksum: str
 
 
+class ScoreAnnounceView(TypedDict):
+    user_id: int
+    map_id: int
+    artist: str
+    title: str
+    version: str
+    acc: float
+    pp: float
+    mods: int
+
+
 async def create(
     map_md5: str,
     score: int,
@@ -172,6 +186,56 @@ async def fetch_one(id: int) -> Score | None:
     return cast(Score | None, _score)
 
 
+async def fetch_placement(map_md5: str, mode: int, pp: float, score: int) -> int:
+    """\
+    Fetch a score's leaderboard placement on its map,
+    among best scores of unrestricted players.
+
+    Placement is ranked by pp on relax & autopilot modes, and by score
+    otherwise. Only that one metric is compared, so that the query can be
+    served by `scores_placement_pp_index` or `scores_placement_score_index`.
+    """
+    if mode >= GameMode.RELAX_OSU:
+        better = ScoresTable.pp > pp
+    else:
+        better = ScoresTable.score > score
+
+    select_stmt = (
+        select(func.count().label("count"))
+        .select_from(ScoresTable)
+        .join(UsersTable, ScoresTable.userid == UsersTable.id)
+        .where(ScoresTable.map_md5 == map_md5)
+        .where(ScoresTable.mode == mode)
+        .where(ScoresTable.status == 2)  # best
+        .where(UsersTable.priv.op("&")(1) != 0)  # unrestricted
+        .where(better)
+    )
+
+    rec = await app.state.services.database.fetch_one(select_stmt)
+    assert rec is not None
+    return cast(int, rec["count"]) + 1
+
+
+async def fetch_announce_view(id: int) -> ScoreAnnounceView | None:
+    """Fetch the fields needed to announce a score, joined in a single query."""
+    select_stmt = (
+        select(
+            ScoresTable.userid.label("user_id"),
+            MapsTable.id.label("map_id"),
+            MapsTable.artist,
+            MapsTable.title,
+            MapsTable.version,
+            ScoresTable.acc,
+            ScoresTable.pp,
+            ScoresTable.mods,
+        )
+        .join(MapsTable, MapsTable.md5 == ScoresTable.map_md5)
+        .where(ScoresTable.id == id)
+    )
+    view = await app.state.services.database.fetch_one(select_stmt)
+    return cast(ScoreAnnounceView | None, view)
+
+
 async def fetch_count(
     map_md5: str | None = None,
     mods: int | None = None,
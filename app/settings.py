@@ -51,8 +51,10 @@ REDIRECT_OSU_URLS = read_bool(os.environ["REDIRECT_OSU_URLS"])
 
 PP_CACHED_ACCURACIES = [int(acc) for acc in read_list(os.environ["PP_CACHED_ACCS"])]
 
-DISALLOWED_NAMES = read_list(os.environ["DISALLOWED_NAMES"])
-DISALLOWED_PASSWORDS = read_list(os.environ["DISALLOWED_PASSWORDS"])
+DISALLOWED_NAMES = frozenset(read_list(os.environ["DISALLOWED_NAMES"]))
+DISALLOWED_PASSWORDS = frozenset(
+    map(str.lower, read_list(os.environ["DISALLOWED_PASSWORDS"])),
+)
 DISALLOW_OLD_CLIENTS = read_bool(os.environ["DISALLOW_OLD_CLIENTS"])
 DISALLOW_INGAME_REGISTRATION = read_bool(os.environ["DISALLOW_INGAME_REGISTRATION"])
 
@@ -70,6 +72,8 @@ LOG_WITH_COLORS = read_bool(os.environ["LOG_WITH_COLORS"])
 DEVELOPER_MODE = read_bool(os.environ["DEVELOPER_MODE"])
 
 OMAJINAI_BASE_URL = os.environ["OMAJINAI_BASE_URL"]
+OMAJINAI_MAX_RPS = float(os.environ.get("OMAJINAI_MAX_RPS") or 0) or None
+OMAJINAI_CACHE_VERSION = os.environ.get("OMAJINAI_CACHE_VERSION") or None
 
 with open("pyproject.toml", "rb") as f:
     VERSION = tomllib.load(f)["tool"]["poetry"]["version"]
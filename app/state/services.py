@@ -36,6 +36,12 @@ SQL_UPDATES_FILE = Path.cwd() / "migrations/migrations.sql"
 http_client = httpx.AsyncClient()
 database = Database(app.settings.DB_DSN)
 redis: aioredis.Redis = aioredis.from_url(app.settings.REDIS_DSN)  # type: ignore[no-untyped-call]
+# pubsub gets its own client which decodes responses, so channels & payloads
+# arrive as str; the main client stays in bytes mode for everything else.
+pubsub_redis: aioredis.Redis = aioredis.from_url(  # type: ignore[no-untyped-call]
+    app.settings.REDIS_DSN,
+    decode_responses=True,
+)
 
 datadog: datadog_client.ThreadStats | None = None
 if str(app.settings.DATADOG_API_KEY) and str(app.settings.DATADOG_APP_KEY):
@@ -47,9 +53,11 @@ if str(app.settings.DATADOG_API_KEY) and str(app.settings.DATADOG_APP_KEY):
 
 ip_resolver: IPResolver
 
-omajinai: Omajinai = Omajinai(
+omajinai: Omajinai = Omajinai.create(
     base_url=app.settings.OMAJINAI_BASE_URL,
-    http_client=http_client,
+    max_rps=app.settings.OMAJINAI_MAX_RPS,
+    redis=redis,
+    cache_version=app.settings.OMAJINAI_CACHE_VERSION,
 )
 
 """ session usecases """
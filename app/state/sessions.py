@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Coroutine
 from typing import TYPE_CHECKING
 from typing import Any
 
@@ -21,12 +22,23 @@ api_keys: dict[str, int] = {}
 
 housekeeping_tasks: set[asyncio.Task[Any]] = set()
 
+# fire-and-forget tasks; the loop only keeps weak references
+# to tasks, so we hold them here until they've completed.
+background_tasks: set[asyncio.Task[Any]] = set()
+
 bot: Player
 
 
 # use cases
 
 
+def create_background_task(coro: Coroutine[Any, Any, Any]) -> None:
+    """Schedule `coro` to run without awaiting it, retaining the task."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
 async def cancel_housekeeping_tasks() -> None:
     log(
         f"-> Cancelling {len(housekeeping_tasks)} housekeeping tasks.",
@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import asyncio
 from collections.abc import Iterable
 from dataclasses import dataclass
 from dataclasses import replace
-from typing import Any
 
 import app
+from app.adapters.omajinai import PerformanceRequest
 from app.adapters.omajinai import PerformanceResult
 
 
@@ -23,20 +22,20 @@ class ScoreParams:
 async def calculate_performances(
     beatmap_id: int,
     scores: Iterable[ScoreParams],
-) -> list[dict[str, Any]]:
+) -> list[PerformanceResult]:
     """\
     Calculate performance for multiple scores on a single beatmap.
 
     Typically most useful for mass-recalculation situations.
     """
-
-    async def _(score: ScoreParams) -> dict[str, Any]:
+    requests = []
+    for score in scores:
         # HACK: handling !with command
         if not score.acc:
             score.acc = 100.0
 
-        result: PerformanceResult = (
-            await app.state.services.omajinai.calculate_performance_single(
+        requests.append(
+            PerformanceRequest(
                 beatmap_id=beatmap_id,
                 mode=score.mode,
                 mods=score.mods,
@@ -44,15 +43,13 @@ async def calculate_performances(
                 accuracy=score.acc,
                 miss_count=score.nmiss,
                 legacy_score=score.legacy_score,
-            )
+            ),
         )
 
-        return {
-            "performance": {"pp": result.pp, "hypothetical_pp": result.hypothetical_pp},
-            "difficulty": {"stars": result.stars},
-        }
-
-    # parallelize calculations
-    # each calculation is independent of the others
-    # and the performance gain is *GODLY*
-    return await asyncio.gather(*[_(score) for score in scores])
+    # send every score to omajinai in a single round-trip;
+    # the adapter falls back to one request per score if
+    # the service doesn't support batching.
+    results: list[PerformanceResult] = (
+        await app.state.services.omajinai.calculate_performance_batch(requests)
+    )
+    return results
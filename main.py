@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import sys
 
 import uvicorn
 
@@ -14,10 +15,22 @@ app.logging.configure_logging()
 
 def main() -> int:
     app.utils.display_startup_dialog()
+
+    # we're heavily event-loop bound (http, redis, mysql & the omajinai
+    # adapter's futures), so always run on uvloop, or winloop on windows.
+    if sys.platform == "win32":
+        import winloop
+
+        winloop.install()
+        event_loop = "none"  # use the policy we've just installed
+    else:
+        event_loop = "uvloop"
+
     uvicorn.run(
         "app.api.init_api:asgi_app",
         reload=app.settings.DEBUG,
         log_level=logging.WARNING,
+        loop=event_loop,
         server_header=False,
         date_header=False,
         headers=[("bancho-version", app.settings.VERSION)],
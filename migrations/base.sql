@@ -256,6 +256,10 @@ create index scores_online_checksum_index
 	on scores (online_checksum);
 create index scores_fetch_leaderboard_generic_index
 	on scores (map_md5, status, mode);
+create index scores_placement_pp_index
+	on scores (map_md5, mode, status, pp, userid);
+create index scores_placement_score_index
+	on scores (map_md5, mode, status, score, userid);
 
 create table startups
 (
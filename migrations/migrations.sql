@@ -478,3 +478,9 @@ create index scores_fetch_leaderboard_generic_index
 
 # v5.3.1
 alter table scores modify column pp double(10,3) not null;
+
+# v5.3.2
+create index scores_placement_pp_index
+	on scores (map_md5, mode, status, pp, userid);
+create index scores_placement_score_index
+	on scores (map_md5, mode, status, score, userid);
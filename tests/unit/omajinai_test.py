@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import orjson
+import pytest
+from redis.exceptions import RedisError
+
+import app.adapters.omajinai
+from app.adapters.omajinai import Omajinai
+from app.adapters.omajinai import PerformanceRequest
+from app.adapters.omajinai import _RateLimiter
+
+BASE_URL = "http://omajinai"
+
+RESULT = {"stars": 5.0, "pp": 300.0, "hypothetical_pp": 320.0}
+
+
+def make_omajinai(handler, **kwargs) -> Omajinai:
+    http_client = httpx.AsyncClient(
+        base_url=BASE_URL,
+        transport=httpx.MockTransport(handler),
+    )
+    return Omajinai(base_url=BASE_URL, http_client=http_client, **kwargs)
+
+
+def make_request(beatmap_id: int = 1, **kwargs) -> PerformanceRequest:
+    fields = {
+        "beatmap_id": beatmap_id,
+        "mode": 0,
+        "mods": 0,
+        "max_combo": 500,
+        "accuracy": 98.5,
+        "miss_count": 1,
+        "legacy_score": 1_000_000,
+    }
+    fields.update(kwargs)
+    return PerformanceRequest(**fields)
+
+
+class FakeRedis:
+    """Just enough of redis for the adapter's persisted results."""
+
+    def __init__(self, broken: bool = False) -> None:
+        self.broken = broken
+        self.store: dict[str, bytes] = {}
+        self.queued: list[tuple[str, bytes]] = []
+
+    async def mget(self, keys):
+        if self.broken:
+            raise RedisError("connection refused")
+
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> FakeRedis:
+        return self
+
+    async def __aenter__(self) -> FakeRedis:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.queued.clear()
+
+    def set(self, key: str, value: bytes, ex: int | None = None) -> None:
+        self.queued.append((key, value))
+
+    async def execute(self) -> None:
+        if self.broken:
+            raise RedisError("connection refused")
+
+        self.store.update(self.queued)
+
+
+def batch_response(request: httpx.Request) -> httpx.Response:
+    payload = orjson.loads(request.content)
+    return httpx.Response(200, json={"data": [RESULT] * len(payload)})
+
+
+async def test_batch_serves_cached_results_locally():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return batch_response(request)
+
+    omajinai = make_omajinai(handler)
+    batch = [make_request(1), make_request(2)]
+
+    first = await omajinai.calculate_performance_batch(batch)
+    second = await omajinai.calculate_performance_batch(batch)
+
+    assert len(requests) == 1
+    assert first == second
+    assert [result.pp for result in second] == [300.0, 300.0]
+
+
+async def test_batch_sends_duplicate_requests_once():
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(orjson.loads(request.content))
+        return batch_response(request)
+
+    omajinai = make_omajinai(handler)
+
+    results = await omajinai.calculate_performance_batch(
+        [make_request(1), make_request(2), make_request(1)],
+    )
+
+    assert len(payloads) == 1
+    assert [params["beatmap_id"] for params in payloads[0]] == [1, 2]
+    assert len(results) == 3
+
+
+@pytest.mark.parametrize("status_code", [404, 405, 501])
+async def test_batch_falls_back_to_single_requests_when_unsupported(status_code):
+    methods = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        methods.append(request.method)
+        if request.url.path == "/calculate/batch":
+            return httpx.Response(status_code)
+
+        return httpx.Response(200, json={"data": RESULT})
+
+    omajinai = make_omajinai(handler)
+
+    results = await omajinai.calculate_performance_batch(
+        [make_request(1), make_request(2)],
+    )
+    assert [result.pp for result in results] == [300.0, 300.0]
+    assert methods == ["POST", "GET", "GET"]
+
+    # batching isn't attempted again once omajinai said it's unsupported
+    methods.clear()
+    await omajinai.calculate_performance_batch([make_request(3), make_request(4)])
+    assert methods == ["GET", "GET"]
+
+
+async def test_failed_batch_records_failures():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(500)
+
+    omajinai = make_omajinai(handler)
+    batch = [make_request(1), make_request(2)]
+
+    results = await omajinai.calculate_performance_batch(batch)
+    assert [result.pp for result in results] == [0.0, 0.0]
+
+    # neither is retried individually, nor again while still cooling down
+    await omajinai.calculate_performance_batch(batch)
+    assert len(requests) == 1
+
+
+async def test_batch_with_mismatched_result_count_fails():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"data": [RESULT]})
+
+    omajinai = make_omajinai(handler)
+
+    results = await omajinai.calculate_performance_batch(
+        [make_request(1), make_request(2)],
+    )
+
+    assert [result.pp for result in results] == [0.0, 0.0]
+
+
+async def test_unset_params_are_omitted():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/calculate/batch":
+            return batch_response(request)
+
+        return httpx.Response(200, json={"data": RESULT})
+
+    omajinai = make_omajinai(handler)
+    unset = {"mods": None, "max_combo": None, "miss_count": None}
+
+    await omajinai.calculate_performance_single(
+        beatmap_id=1,
+        mode=0,
+        accuracy=100.0,
+        legacy_score=0,
+        **unset,
+    )
+    await omajinai.calculate_performance_batch(
+        [make_request(2, **unset), make_request(3, **unset)],
+    )
+
+    single, batch = requests
+    assert set(single.url.params) == {
+        "beatmap_id",
+        "mode",
+        "accuracy",
+        "legacy_score",
+    }
+    assert b"None" not in single.url.query
+
+    for params in orjson.loads(batch.content):
+        assert set(params) == {"beatmap_id", "mode", "accuracy", "legacy_score"}
+
+
+async def test_cancelled_caller_does_not_affect_shared_request():
+    release = asyncio.Event()
+    requests: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await release.wait()
+        return httpx.Response(200, json={"data": RESULT})
+
+    omajinai = make_omajinai(handler)
+    args = (1, 0, 0, 500, 98.5, 1, 1_000_000)
+
+    # a cancelled waiter leaves the sender's result intact
+    sender = asyncio.create_task(omajinai.calculate_performance_single(*args))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(omajinai.calculate_performance_single(*args))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert (await sender).pp == 300.0
+    assert waiter.cancelled()
+    assert len(requests) == 1
+
+    # a cancelled sender hands the request over to its waiter
+    release.clear()
+    args = (2, *args[1:])
+
+    sender = asyncio.create_task(omajinai.calculate_performance_single(*args))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(omajinai.calculate_performance_single(*args))
+    await asyncio.sleep(0)
+
+    sender.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert (await waiter).pp == 300.0
+    assert sender.cancelled()
+
+
+async def test_rate_limiter_bursts_then_refills_at_rate():
+    limiter = _RateLimiter(50)
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    for _ in range(50):
+        await limiter.acquire()
+    assert loop.time() - start < 0.05
+
+    # the burst is spent; the rest trickle in at 50 per second
+    start = loop.time()
+    for _ in range(10):
+        await limiter.acquire()
+    assert 0.15 <= loop.time() - start < 0.5
+
+
+@pytest.mark.parametrize("rate", [0, -1.0])
+def test_rate_limiter_rejects_non_positive_rates(rate):
+    with pytest.raises(ValueError):
+        _RateLimiter(rate)
+
+
+def counting_handler(requests: list[httpx.Request]):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/calculate/batch":
+            return batch_response(request)
+
+        return httpx.Response(200, json={"data": RESULT})
+
+    return handler
+
+
+async def test_persisted_results_survive_restarts():
+    redis = FakeRedis()
+    requests: list[httpx.Request] = []
+    batch = [make_request(1), make_request(2)]
+
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v1",
+    )
+    await omajinai.calculate_performance_batch(batch)
+    await omajinai.aclose()  # waits for the results to be written
+    assert len(redis.store) == 2
+    assert all(key.startswith("omajinai:performance:v1:") for key in redis.store)
+
+    # a fresh adapter, with an empty local cache, reads them back from redis
+    requests.clear()
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v1",
+    )
+    results = await omajinai.calculate_performance_batch(batch)
+    single = await omajinai.calculate_performance_single(
+        1, 0, 0, 500, 98.5, 1, 1_000_000
+    )
+
+    assert requests == []
+    assert [result.pp for result in results] == [300.0, 300.0]
+    assert single.pp == 300.0
+
+    # but not once the calculator's version changes
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v2",
+    )
+    await omajinai.calculate_performance_batch(batch)
+    assert len(requests) == 1
+
+
+async def test_corrupt_persisted_results_are_misses():
+    redis = FakeRedis()
+    requests: list[httpx.Request] = []
+    batch = [make_request(1), make_request(2)]
+
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v1",
+    )
+    await omajinai.calculate_performance_batch(batch)
+    await omajinai.aclose()
+
+    assert len(redis.store) == 2
+    redis.store = dict.fromkeys(redis.store, b"not json")
+
+    requests.clear()
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v1",
+    )
+    results = await omajinai.calculate_performance_batch(batch)
+
+    assert len(requests) == 1
+    assert [result.pp for result in results] == [300.0, 300.0]
+
+
+async def test_redis_errors_are_misses():
+    redis = FakeRedis(broken=True)
+    requests: list[httpx.Request] = []
+
+    omajinai = make_omajinai(
+        counting_handler(requests),
+        redis=redis,
+        cache_version="v1",
+    )
+    results = await omajinai.calculate_performance_batch(
+        [make_request(1), make_request(2)],
+    )
+    single = await omajinai.calculate_performance_single(
+        3, 0, 0, 500, 98.5, 1, 1_000_000
+    )
+    await omajinai.aclose()
+
+    assert len(requests) == 2
+    assert [result.pp for result in results] == [300.0, 300.0]
+    assert single.pp == 300.0
+
+
+async def test_failed_single_requests_cool_down_before_retrying(monkeypatch):
+    monkeypatch.setattr(app.adapters.omajinai, "FAILURE_COOLDOWN", 0.05)
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(500)
+
+    omajinai = make_omajinai(handler)
+    args = (1, 0, 0, 500, 98.5, 1, 1_000_000)
+
+    assert (await omajinai.calculate_performance_single(*args)).pp == 0.0
+    assert (await omajinai.calculate_performance_single(*args)).pp == 0.0
+    assert len(requests) == 1
+
+    await asyncio.sleep(0.06)
+
+    await omajinai.calculate_performance_single(*args)
+    assert len(requests) == 2
+
+
+async def test_cache_evicts_least_recently_used_results():
+    requests: list[httpx.Request] = []
+    omajinai = make_omajinai(counting_handler(requests), cache_size=2)
+
+    args = (0, 0, 500, 98.5, 1, 1_000_000)
+
+    def calculate(beatmap_id: int):
+        return omajinai.calculate_performance_single(beatmap_id, *args)
+
+    await calculate(1)
+    await calculate(2)
+    await calculate(1)  # now more recently used than 2
+    await calculate(3)  # evicts 2
+    assert len(requests) == 3
+
+    await calculate(1)
+    await calculate(3)
+    assert len(requests) == 3
+
+    await calculate(2)
+    assert len(requests) == 4
+
+
+async def test_failed_results_are_never_cached(monkeypatch):
+    monkeypatch.setattr(app.adapters.omajinai, "FAILURE_COOLDOWN", 0.05)
+    responses = [httpx.Response(500), httpx.Response(200, json={"data": RESULT})]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    omajinai = make_omajinai(handler)
+    args = (1, 0, 0, 500, 98.5, 1, 1_000_000)
+
+    assert (await omajinai.calculate_performance_single(*args)).pp == 0.0
+
+    await asyncio.sleep(0.06)
+
+    assert (await omajinai.calculate_performance_single(*args)).pp == 300.0
+    assert responses == []